@@ -0,0 +1,111 @@
+"""A CUDA backend for evaluating a whole population of individuals on the GPU.
+
+The target image is uploaded once, and only the circles are uploaded each time a population is
+evaluated. Only the fitnesses are copied back.
+"""
+import math
+
+import numpy as np
+from numba import cuda, float32, int32
+
+# The width and height of the square tile of pixels each thread block rasterizes.
+TILE_SIZE = 16
+
+
+@cuda.jit
+def _rasterize_and_score(circles, target, fill, sums):
+    """Rasterize a tile of an individual's image and add its difference to the target to sums.
+
+    The grid is (tiles, individuals), and each block is one TILE_SIZE x TILE_SIZE tile of one
+    individual's image, with one thread per pixel.
+
+    :param circles: The (individuals, ind_size, 4) array of (cx, cy, r, color) circles.
+    :param target: The target image.
+    :param fill: The image background color.
+    :param sums: The (individuals,) output array of summed absolute differences.
+    """
+    # Each block loads its individual's circles into shared memory once.
+    shared = cuda.shared.array(0, dtype=float32)
+    partial = cuda.shared.array(TILE_SIZE * TILE_SIZE, dtype=int32)
+
+    ind = cuda.blockIdx.y
+    tid = cuda.threadIdx.y * TILE_SIZE + cuda.threadIdx.x
+    ind_size = circles.shape[1]
+    for k in range(tid, ind_size * 4, TILE_SIZE * TILE_SIZE):
+        shared[k] = circles[ind, k // 4, k % 4]
+    cuda.syncthreads()
+
+    height, width = target.shape
+    tiles_x = (width + TILE_SIZE - 1) // TILE_SIZE
+    yy = (cuda.blockIdx.x // tiles_x) * TILE_SIZE + cuda.threadIdx.y
+    xx = (cuda.blockIdx.x % tiles_x) * TILE_SIZE + cuda.threadIdx.x
+
+    diff = 0
+    if yy < height and xx < width:
+        value = fill
+        for j in range(ind_size):
+            cx, cy, r = int(shared[4 * j]), int(shared[4 * j + 1]), shared[4 * j + 2]
+            dy = yy - cy
+            if abs(dy) <= int(r) and abs(xx - cx) <= int(math.sqrt(r * r - dy * dy)):
+                value += int(shared[4 * j + 3])
+        # The pixel is accumulated in a wide integer, so overlapping circles never wrap around.
+        diff = abs(value - int(target[yy, xx]))
+    partial[tid] = diff
+    cuda.syncthreads()
+
+    # Reduce the tile's differences, and add them to the individual's total.
+    stride = TILE_SIZE * TILE_SIZE // 2
+    while stride > 0:
+        if tid < stride:
+            partial[tid] += partial[tid + stride]
+        cuda.syncthreads()
+        stride //= 2
+
+    if tid == 0:
+        cuda.atomic.add(sums, ind, partial[0])
+
+
+class CudaEvaluator:
+    """Evaluates the fitnesses of populations of individuals on the GPU."""
+
+    def __init__(self, target, pop_size, ind_size):
+        """Initialize the evaluator.
+
+        :param target: The target image.
+        :type target: A 2D array of int16's.
+        :param pop_size: The largest number of individuals that will be evaluated at once.
+        :param ind_size: The number of circles composing an individual.
+        """
+        self.height, self.width = target.shape
+        self.target = cuda.to_device(target)
+
+        self.host_circles = cuda.pinned_array((pop_size, ind_size, 4), dtype=np.float32)
+        self.circles = cuda.device_array((pop_size, ind_size, 4), dtype=np.float32)
+        self.sums = cuda.device_array(pop_size, dtype=np.int64)
+
+    def evaluate(self, cxs, cys, rs, colors, fitnesses, fill=255):
+        """Compute the fitnesses of the given population.
+
+        :param cxs, cys, rs, colors: The (pop_size, ind_size) circle fields of the population.
+        :param fitnesses: The (pop_size,) output array of fitnesses.
+        :param fill: The image background color.
+        """
+        n, ind_size = cxs.shape
+        if n == 0:
+            return
+
+        for field, values in enumerate((cxs, cys, rs, colors)):
+            self.host_circles[:n, :, field] = values
+        circles, sums = self.circles[:n], self.sums[:n]
+        circles.copy_to_device(self.host_circles[:n])
+        sums.copy_to_device(np.zeros(n, dtype=np.int64))
+
+        tiles = ((self.height + TILE_SIZE - 1) // TILE_SIZE) * (
+            (self.width + TILE_SIZE - 1) // TILE_SIZE
+        )
+        shared_bytes = ind_size * 4 * np.dtype(np.float32).itemsize
+        _rasterize_and_score[(tiles, n), (TILE_SIZE, TILE_SIZE), 0, shared_bytes](
+            circles, self.target, fill, sums
+        )
+
+        fitnesses[:] = sums.copy_to_host() / (self.height * self.width)
@@ -0,0 +1,182 @@
+"""Numba kernels for the hot loops of the evolutionary algorithms.
+
+The circles are passed in as separate contiguous arrays of center x's, center y's, radii, and
+colors rather than as an array of CircleDtype objects so that numba can read each field linearly.
+
+The circle colors are truncated to integers when they are drawn, just like in the CUDA kernel.
+The EA's scratch tiles are int32's rather than int16's, because int16's only have room for about
+128 full intensity circles overlapping the background, and would silently wrap around beyond that.
+
+The kernels that the EA runs every generation are built by make_kernels() for a specific image
+size, so that numba can compile them with the image dimensions as constants.
+"""
+import collections
+import functools
+import math
+
+import numba
+import numpy as np
+from numba import njit, prange
+
+# The width and height of the square tiles evaluate_pop() rasterizes and scores at a time. A tile
+# of both the image and the target fits comfortably in L1 cache.
+TILE_SIZE = 64
+
+
+@njit(fastmath=True, cache=True)
+def _half_span(dy, r):
+    """The half width of the row of the circle of radius r that is dy rows from its center.
+
+    The pixels cx - dx through cx + dx of that row are inside the circle, so a circle can be filled
+    one contiguous span at a time instead of testing every pixel in its bounding box.
+    """
+    return int(math.sqrt(r * r - dy * dy))
+
+
+@njit(fastmath=True, cache=True)
+def _rasterize_row(img, yy, width, cxs, cys, rs, colors, fill):
+    """Rasterize the given circles into a single row of the given image."""
+    for xx in range(width):
+        img[yy, xx] = fill
+
+    for i in range(len(cxs)):
+        cx, cy, r = int(cxs[i]), int(cys[i]), rs[i]
+        ri = int(r)
+        if yy < cy - ri or yy > cy + ri:
+            continue
+
+        color = int(colors[i])
+        dx = _half_span(yy - cy, r)
+        for xx in range(max(0, cx - dx), min(width, cx + dx + 1)):
+            img[yy, xx] += color
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def rasterize(img, cxs, cys, rs, colors, fill):
+    """Rasterize the given circles into the given image.
+
+    The rows of the image are filled in parallel. Each thread owns a row, so no two threads ever
+    write to the same pixel, even though the circles overlap.
+
+    :param img: The preallocated image to fill.
+    :type img: A (height, width) numpy array.
+    :param cxs: The x coordinates of the circle centers.
+    :param cys: The y coordinates of the circle centers.
+    :param rs: The circle radii.
+    :param colors: The circle colors.
+    :param fill: The image background color.
+    """
+    for yy in prange(img.shape[0]):
+        _rasterize_row(img, yy, img.shape[1], cxs, cys, rs, colors, fill)
+
+
+@njit(fastmath=True, cache=True)
+def _draw_circle(tile, y0, y1, x0, x1, cx, cy, r, color):
+    """Add the part of the given circle inside the rows y0:y1 and columns x0:x1 to the given tile.
+
+    The tile holds the pixels of that part of the image, so pixel (yy, xx) of the image is pixel
+    (yy - y0, xx - x0) of the tile. The circle is drawn one row span at a time.
+    """
+    cx, cy, ri, color = int(cx), int(cy), int(r), int(color)
+    for yy in range(max(y0, cy - ri), min(y1, cy + ri + 1)):
+        dx = _half_span(yy - cy, r)
+        for xx in range(max(x0, cx - dx), min(x1, cx + dx + 1)):
+            tile[yy - y0, xx - x0] += color
+
+
+@njit(fastmath=True, cache=True)
+def _rasterize_and_score_tiled(tile, target, height, width, cxs, cys, rs, colors, fill):
+    """Rasterize the given circles and return the absolute difference to the target, tile by tile.
+
+    The circles are first bucketed by the tiles their bounding boxes overlap. Then each tile is
+    filled, drawn with only its own circles, and compared against the target. Every tile is drawn
+    into the same (TILE_SIZE, TILE_SIZE) scratch tile, so the whole image is never stored.
+    """
+    tiles_y = (height + TILE_SIZE - 1) // TILE_SIZE
+    tiles_x = (width + TILE_SIZE - 1) // TILE_SIZE
+    tiles = tiles_y * tiles_x
+
+    # Find the range of tiles each circle overlaps. An empty range means the circle is off image.
+    ind_size = len(cxs)
+    bounds = np.empty((ind_size, 4), dtype=np.int64)
+    starts = np.zeros(tiles + 1, dtype=np.int64)
+    for j in range(ind_size):
+        cx, cy, ri = int(cxs[j]), int(cys[j]), int(rs[j])
+        bounds[j, 0] = max(0, cy - ri) // TILE_SIZE
+        bounds[j, 1] = min(height - 1, cy + ri) // TILE_SIZE + 1
+        bounds[j, 2] = max(0, cx - ri) // TILE_SIZE
+        bounds[j, 3] = min(width - 1, cx + ri) // TILE_SIZE + 1
+        for ty in range(bounds[j, 0], bounds[j, 1]):
+            for tx in range(bounds[j, 2], bounds[j, 3]):
+                starts[ty * tiles_x + tx + 1] += 1
+
+    # Bucket the circles by tile, keeping the circles of tile t in buckets[starts[t]:starts[t+1]].
+    for t in range(tiles):
+        starts[t + 1] += starts[t]
+    buckets = np.empty(starts[tiles], dtype=np.int64)
+    ends = starts[:-1].copy()
+    for j in range(ind_size):
+        for ty in range(bounds[j, 0], bounds[j, 1]):
+            for tx in range(bounds[j, 2], bounds[j, 3]):
+                t = ty * tiles_x + tx
+                buckets[ends[t]] = j
+                ends[t] += 1
+
+    acc = 0
+    for ty in range(tiles_y):
+        y0, y1 = ty * TILE_SIZE, min(height, (ty + 1) * TILE_SIZE)
+        for tx in range(tiles_x):
+            x0, x1 = tx * TILE_SIZE, min(width, (tx + 1) * TILE_SIZE)
+            tile[:] = fill
+
+            t = ty * tiles_x + tx
+            for k in range(starts[t], starts[t + 1]):
+                j = buckets[k]
+                _draw_circle(tile, y0, y1, x0, x1, cxs[j], cys[j], rs[j], colors[j])
+
+            for yy in range(y0, y1):
+                for xx in range(x0, x1):
+                    acc += abs(tile[yy - y0, xx - x0] - target[yy, xx])
+    return acc
+
+
+Kernels = collections.namedtuple("Kernels", ["evaluate_pop"])
+
+
+@functools.lru_cache(maxsize=None)
+def make_kernels(height, width):
+    """Build the population kernels specialized for (height, width) images.
+
+    The image dimensions are baked into the kernels as compile time constants, so that numba can
+    resolve the loop bounds and strides up front. Each image size gets its own compiled kernels,
+    which numba caches on disk just like the generic kernels.
+    """
+    size = height * width
+    threads = numba.config.NUMBA_NUM_THREADS
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def evaluate_pop(cxs, cys, rs, colors, target, fitnesses, fill):
+        """Rasterize every individual in the given population and compute their fitnesses.
+
+        The individuals are evaluated in parallel. They are dealt out round-robin to one chunk per
+        thread, and each chunk rasterizes and scores its individuals in its own scratch tile.
+
+        :param cxs: The (pop_size, ind_size) x coordinates of the circle centers.
+        :param cys: The (pop_size, ind_size) y coordinates of the circle centers.
+        :param rs: The (pop_size, ind_size) circle radii.
+        :param colors: The (pop_size, ind_size) circle colors.
+        :param target: The target image to compare against.
+        :param fitnesses: The (pop_size,) output array of fitnesses.
+        :param fill: The image background color.
+        """
+        pop_size = len(fitnesses)
+        chunks = min(threads, pop_size)
+        for chunk in prange(chunks):
+            tile = np.empty((TILE_SIZE, TILE_SIZE), dtype=np.int32)
+            for i in range(chunk, pop_size, chunks):
+                acc = _rasterize_and_score_tiled(
+                    tile, target, height, width, cxs[i], cys[i], rs[i], colors[i], fill
+                )
+                fitnesses[i] = acc / size
+
+    return Kernels(evaluate_pop)
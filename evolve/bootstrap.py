@@ -1,6 +1,6 @@
 import numpy as np
 
-from .utils import CircleDtype, fitness
+from .utils import CircleDtype, disk
 
 
 class BootstrapAlgorithm:
@@ -46,24 +46,21 @@ class BootstrapAlgorithm:
         self.approximation.fill(255)
         # The individual this algorithm is building.
         self.individual = np.zeros(circles, dtype=CircleDtype)
+        # The difference between the approximation and the target, and its total, which are reused
+        # to evaluate every circle for as long as the approximation doesn't change.
+        self.residual = self.approximation - self.target
+        self.residual_sum = np.sum(np.abs(self.residual))
 
         np.random.seed(seed)
 
     def init_pop(self):
         """Randomly initialize the population of circles."""
-        for circle in self.population:
-            self.init_circle(circle)
-
-    def init_circle(self, circle):
-        """Randomly initialize the given circle.
-
-        :param circle: The circle to initialize.
-        :type circle: A single CircleDtype object.
-        """
-        circle["color"] = np.random.randint(-255, 256)
-        circle["radius"] = np.random.randint(20, max(self.height, self.width))
-        circle["center"]["x"] = np.random.randint(0, self.width)
-        circle["center"]["y"] = np.random.randint(0, self.height)
+        self.population["color"] = np.random.randint(-255, 256, size=self.pop_size)
+        self.population["radius"] = np.random.randint(
+            20, max(self.height, self.width), size=self.pop_size
+        )
+        self.population["center"]["x"] = np.random.randint(0, self.width, size=self.pop_size)
+        self.population["center"]["y"] = np.random.randint(0, self.height, size=self.pop_size)
 
     def perturb_radius(self, circle, scale):
         """Perturb the radius of the given circle."""
@@ -93,25 +90,25 @@ class BootstrapAlgorithm:
             self.perturb_color(mutant, scale)
             self.perturb_center(mutant, scale)
 
+    def circle_fitness(self, circle):
+        """Determine the fitness of the approximation with the given circle added to it.
+
+        Adding a circle only changes the pixels under the circle, so rather than comparing the whole
+        image against the target, correct the cached total difference for just those pixels.
+        """
+        box, mask = disk(
+            circle["center"]["x"], circle["center"]["y"], circle["radius"], self.height, self.width
+        )
+        covered = self.residual[box][mask]
+
+        diff = np.sum(np.abs(covered + circle["color"])) - np.sum(np.abs(covered))
+        return (self.residual_sum + diff) / (self.height * self.width)
+
     def evaluate(self):
         """Evaluate the fitnesses of the population."""
         for i, (general, mutation) in enumerate(zip(self.population, self.mutations)):
-            cx, cy, r = int(general["center"]["x"]), int(general["center"]["y"]), general["radius"]
-            x, y = np.ogrid[-cy : self.height - cy, -cx : self.width - cx]
-            mask = x ** 2 + y ** 2 <= r ** 2
-            approx = self.approximation + mask * general["color"]
-
-            self.general_fitnesses[i] = fitness(self.target, approx)
-
-            cx, cy, r = (
-                int(mutation["center"]["x"]),
-                int(mutation["center"]["y"]),
-                mutation["radius"],
-            )
-            x, y = np.ogrid[-cy : self.height - cy, -cx : self.width - cx]
-            mask = x ** 2 + y ** 2 <= r ** 2
-            approx = self.approximation + mask * mutation["color"]
-            self.mutation_fitnesses[i] = fitness(self.target, approx)
+            self.general_fitnesses[i] = self.circle_fitness(general)
+            self.mutation_fitnesses[i] = self.circle_fitness(mutation)
 
     def select(self):
         """Perform selection on the combined general and mutation populations."""
@@ -123,9 +120,10 @@ class BootstrapAlgorithm:
 
     def add_to_image(self, image, circle):
         """Add the given circle to the given image."""
-        cx, cy, r = int(circle["center"]["x"]), int(circle["center"]["y"]), circle["radius"]
-        x, y = np.ogrid[-cy : self.height - cy, -cx : self.width - cx]
-        image[x ** 2 + y ** 2 <= r ** 2] += circle["color"]
+        box, mask = disk(
+            circle["center"]["x"], circle["center"]["y"], circle["radius"], self.height, self.width
+        )
+        image[box][mask] += circle["color"]
 
     def run(self):
         """Run the bootstrap algorithm."""
@@ -140,5 +138,7 @@ class BootstrapAlgorithm:
             best = self.population[np.argmin(self.general_fitnesses)]
             self.individual[i] = best
             self.add_to_image(self.approximation, best)
+            self.residual = self.approximation - self.target
+            self.residual_sum = np.sum(np.abs(self.residual))
 
         return self.individual, self.approximation
@@ -1,11 +1,22 @@
 import itertools
-from multiprocessing import Pool
+from multiprocessing import Pool, shared_memory
 
 import numpy as np
 
 from evolve import BootstrapAlgorithm
 
-from .utils import CircleDtype, fitness, pairwise
+from .utils import CircleDtype, disk, fitness, pairwise
+
+# The target image, shared with each worker process by _init_worker().
+_shm = None
+_target = None
+
+
+def _init_worker(name, shape, dtype):
+    """Attach a worker process to the shared memory block holding the target image."""
+    global _shm, _target
+    _shm = shared_memory.SharedMemory(name=name)
+    _target = np.ndarray(shape, dtype=dtype, buffer=_shm.buf)
 
 
 class CombinedAlgorithm:
@@ -42,15 +53,16 @@ class CombinedAlgorithm:
         self.fitnesses = np.zeros(pop_size)
 
         self.approximation = np.zeros_like(target, dtype="float32")
-
-        self.proc_pool = Pool()
+        # A blank image to reset the approximation with before drawing each individual.
+        self._blank = np.full_like(target, 255, dtype="float32")
 
     @staticmethod
     def worker(args):
         """Find an approximation in a separate process."""
-        seed, (target, circles, pop_size, generations) = args
-        ba = BootstrapAlgorithm(target, circles, pop_size, generations, seed)
-        return ba.run()
+        seed, (circles, pop_size, generations) = args
+        ba = BootstrapAlgorithm(_target, circles, pop_size, generations, seed)
+        individual, _ = ba.run()
+        return individual
 
     def init_pop(self, pop_size, generations):
         """Use the bootstrap method to initialize a population of individuals.
@@ -63,20 +75,29 @@ class CombinedAlgorithm:
         # Use a different seed for each process to avoid results exactly the same as each other.
         seeds = np.random.randint(low=np.iinfo(np.uint32).max, size=self.pop_size)
         print("initializing population... 0%", end="", flush=True)
-        for i, result in enumerate(
-            self.proc_pool.imap_unordered(
-                self.worker,
-                zip(
-                    seeds,
-                    itertools.repeat(
-                        (self.target, self.circles, pop_size, generations), times=self.pop_size
-                    ),
-                ),
-            )
-        ):
-            print(f"\rinitializing population... {100 * i // self.pop_size}%", end="")
-            individual, _ = result
-            self.population[i] = individual
+
+        # Share the target with the workers once, rather than pickling it along with every task.
+        shm = shared_memory.SharedMemory(create=True, size=self.target.nbytes)
+        shape, dtype = self.target.shape, self.target.dtype
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf)[:] = self.target
+        try:
+            with Pool(initializer=_init_worker, initargs=(shm.name, shape, dtype)) as pool:
+                for i, individual in enumerate(
+                    pool.imap_unordered(
+                        self.worker,
+                        zip(
+                            seeds,
+                            itertools.repeat(
+                                (self.circles, pop_size, generations), times=self.pop_size
+                            ),
+                        ),
+                    )
+                ):
+                    print(f"\rinitializing population... {100 * i // self.pop_size}%", end="")
+                    self.population[i] = individual
+        finally:
+            shm.close()
+            shm.unlink()
         print(" done.")
 
     @staticmethod
@@ -106,17 +127,23 @@ class CombinedAlgorithm:
     def compute_image(image, individual, fill_color):
         """Compute the image represented by the given individual."""
         image.fill(fill_color)
+        CombinedAlgorithm.draw(image, individual)
+
+    @staticmethod
+    def draw(image, individual):
+        """Add the circles of the given individual to the given image."""
         height, width = image.shape
         for circle in individual:
-            cx, cy, r = int(circle["center"]["x"]), int(circle["center"]["y"]), circle["radius"]
-            # NOTE: ogrid is much cheaper than meshgrid.
-            x, y = np.ogrid[-cy : height - cy, -cx : width - cx]
-            image[x ** 2 + y ** 2 <= r ** 2] += circle["color"]
+            box, mask = disk(
+                circle["center"]["x"], circle["center"]["y"], circle["radius"], height, width
+            )
+            image[box][mask] += circle["color"]
 
     def evaluate(self):
         """Evaluate the population."""
         for i, individual in enumerate(self.population):
-            self.compute_image(self.approximation, individual, fill_color=255)
+            np.copyto(self.approximation, self._blank)
+            self.draw(self.approximation, individual)
             self.fitnesses[i] = fitness(self.approximation, self.target)
 
         self.population = self.population[np.argsort(self.fitnesses)]
@@ -1,68 +1,68 @@
-import itertools
-from multiprocessing import Pool
-
 import numpy as np
 
-from .utils import CircleDtype, fitness
+from ._kernels import make_kernels, rasterize
+from .utils import CircleDtype
 
 
 class EvolutionaryAlgorithm:
     """Implements an EA to approximate a given image."""
 
-    def __init__(self, image, pop_size, ind_size):
+    def __init__(self, image, pop_size, ind_size, use_cuda=False):
         """Initialize the EA.
 
         :param image: The image to approximate
         :type image: A 2d array of uint8's
         :param pop_size: The number of individuals in the population.
         :param ind_size: The number of circles composing an individual.
+        :param use_cuda: Evaluate the population on a CUDA capable GPU.
         """
-        self.target = image.astype("float32")
+        self.target = image.astype("int16")
         self.height, self.width = image.shape
         self.pop_size = pop_size
         self.ind_size = ind_size
 
-        self.population = np.zeros((pop_size, ind_size), dtype=CircleDtype)
-        self.fitnesses = np.zeros(len(self.population))
+        # The population is stored as a structure of arrays, one (pop_size, ind_size) array per
+        # circle field, so that each field can be operated on (and rasterized) as a whole.
+        self.centers_x = np.zeros((pop_size, ind_size), dtype="float32")
+        self.centers_y = np.zeros((pop_size, ind_size), dtype="float32")
+        self.radii = np.zeros((pop_size, ind_size), dtype="float32")
+        self.colors = np.zeros((pop_size, ind_size), dtype="float32")
+        self.fitnesses = np.zeros(pop_size)
+
+        self.m_centers_x = np.zeros_like(self.centers_x)
+        self.m_centers_y = np.zeros_like(self.centers_y)
+        self.m_radii = np.zeros_like(self.radii)
+        self.m_colors = np.zeros_like(self.colors)
+        self.mutation_fitnesses = np.zeros(pop_size)
 
-        self.mutations = np.zeros_like(self.population)
-        self.mutation_fitnesses = np.zeros(len(self.mutations))
+        self.rng = np.random.default_rng()
+        self.kernels = make_kernels(self.height, self.width)
 
-        self.children = []
-        self.children_fitnesses = np.zeros(len(self.children))
+        self.gpu = None
+        if use_cuda:
+            from ._cuda import CudaEvaluator
 
-        # TODO: If we ever attempt to perform parallel computation, each process will need its own
-        # image represented by a single individual.
-        self.approx = np.zeros(image.shape, dtype="float32")
-        self.pool = Pool()
+            self.gpu = CudaEvaluator(self.target, pop_size, ind_size)
 
     def init_pop(self):
         """Randomly initialize the population."""
-        for individual in self.population:
-            self.init_individual(individual)
-
-    def init_individual(self, individual):
-        """Randomly initialize the given individual.
-
-        :param individual: The individual to initialize.
-        :type individual: An array of CircleDtype objects.
-        """
-        for circle in individual:
-            self.init_circle(circle)
+        size = (self.pop_size, self.ind_size)
+        self.colors[:] = self.rng.integers(0, 256, size=size)
+        # TODO: What should the bounds on the circle radii be?
+        self.radii[:] = self.rng.integers(5, max(self.height, self.width) // 8, size=size)
+        self.centers_x[:] = self.rng.integers(0, self.width, size=size)
+        self.centers_y[:] = self.rng.integers(0, self.height, size=size)
 
-    def init_circle(self, circle):
-        """Randomly initialize the given circle.
+    @property
+    def population(self):
+        """The (centers_x, centers_y, radii, colors) arrays of the general population."""
+        return self.centers_x, self.centers_y, self.radii, self.colors
 
-        :param circle: The circle to initialize.
-        :type circle: A single CircleDtype object.
-        """
-        circle["color"] = np.random.randint(0, 256)
-        # TODO: What should the bounds on the circle radii be?
-        circle["radius"] = np.random.randint(5, max(self.height, self.width) / 8)
-        circle["center"]["x"] = np.random.randint(0, self.width)
-        circle["center"]["y"] = np.random.randint(0, self.height)
+    @property
+    def mutations(self):
+        """The (centers_x, centers_y, radii, colors) arrays of the mutated population."""
+        return self.m_centers_x, self.m_centers_y, self.m_radii, self.m_colors
 
-    # TODO: 99% Of the EA runtime is spent in this function. Make it better.
     @staticmethod
     def compute_image(image, individual, fill_color=255):
         """Compute the image represented by the given individual.
@@ -74,110 +74,70 @@ class EvolutionaryAlgorithm:
         :param fill_color: The image background color.
         :type fill_color: A uint8 between 0 and 255.
         """
-        image.fill(fill_color)
-        height, width = image.shape
-        for circle in individual:
-            # NOTE: The type of circle["center"]["x"] is a numpy uint16. However, for whatever
-            # reason, a numpy uint16 does *not* play nicely with np.ogrid unless it's the value 0.
-            cx, cy, r = int(circle["center"]["x"]), int(circle["center"]["y"]), circle["radius"]
-            # TODO: This is very expensive. Find a way to make it better.
-            x, y = np.ogrid[-cy : height - cy, -cx : width - cx]
-            mask = x ** 2 + y ** 2 <= r ** 2
-            image[mask] += circle["color"]
-
-    @staticmethod
-    def _process_fitness(individual, local_storage):
-        """Compute the fitness of the given individual."""
-        approximation, target = local_storage
-        EvolutionaryAlgorithm.compute_image(approximation, individual)
-        return fitness(approximation, target)
-
-    def update_fitnesses(self, population, fitnesses):
-        """Update the fitnesses for the given population."""
-        results = self.pool.starmap(
-            self._process_fitness,
-            # Using a process makes a copy of your current process, so we have a per-process copy
-            # of an image array and the target array.
-            zip(population, itertools.repeat((self.approx, self.target), times=len(population))),
+        rasterize(
+            image,
+            np.ascontiguousarray(individual["center"]["x"]),
+            np.ascontiguousarray(individual["center"]["y"]),
+            np.ascontiguousarray(individual["radius"]),
+            np.ascontiguousarray(individual["color"]),
+            fill_color,
         )
-        np.copyto(fitnesses, results)
 
-    def evaluate(self, population="general"):
-        """Update the population fitnesses.
+    def _evaluate(self, population, fitnesses):
+        """Rasterize the given population and compute its fitnesses."""
+        if self.gpu is not None:
+            self.gpu.evaluate(*population, fitnesses)
+        else:
+            self.kernels.evaluate_pop(*population, self.target, fitnesses, 255)
 
-        :param population: Which population to evaluate. One of 'all', 'general', 'mutations', or
-        'children'.
-        """
-        if population == "general":
-            self.update_fitnesses(self.population, self.fitnesses)
-        elif population == "mutations":
-            self.update_fitnesses(self.mutations, self.mutation_fitnesses)
-        elif population == "children":
-            self.update_fitnesses(self.children, self.children_fitnesses)
-        elif population == "all":
-            self.update_fitnesses(self.population, self.fitnesses)
-            self.update_fitnesses(self.mutations, self.mutation_fitnesses)
-            self.update_fitnesses(self.children, self.children_fitnesses)
-
-    def perturb_radius(self, circle, scale):
-        """Perturb the radius of the given circle."""
-        dr = np.random.normal(scale=scale)
-        circle["radius"] = max(dr * circle["radius"] + circle["radius"], 1)
-
-    def perturb_color(self, circle, scale):
-        """Perturb the color of the given circle."""
-        dc = np.random.normal(scale=scale)
-        circle["color"] = max(min(dc * circle["color"] + circle["color"], 255), -255)
-
-    def perturb_center(self, circle, scale):
-        """Perturb the center of the given circle."""
-        dx, dy = np.random.normal(scale=scale, size=2)
-        circle["center"]["x"] = max(
-            min(dx * circle["center"]["x"] + circle["center"]["x"], self.width), 0
-        )
-        circle["center"]["y"] = max(
-            min(dy * circle["center"]["y"] + circle["center"]["y"], self.height), 0
-        )
+    def evaluate(self):
+        """Rasterize the general population and update its fitnesses."""
+        self._evaluate(self.population, self.fitnesses)
 
-    def mutate_individual(self, individual, scale):
-        """Mutate the given individual in place."""
-        for circle in individual:
-            # choice = np.random.randint(0, 3)
-            # if choice == 0:
-            #     self.perturb_radius(circle, scale)
-            # elif choice == 1:
-            #     self.perturb_color(circle, scale)
-            # elif choice == 2:
-            #     self.perturb_center(circle, scale)
-
-            # I think we need to perturb all three so that we explore more of the fitness landscape.
-            self.perturb_radius(circle, scale)
-            self.perturb_color(circle, scale)
-            self.perturb_center(circle, scale)
+    def evaluate_mutations(self):
+        """Rasterize the mutated population and update its fitnesses."""
+        self._evaluate(self.mutations, self.mutation_fitnesses)
 
     def mutate(self, scale):
-        """Mutate each individual in the population."""
-        np.copyto(self.mutations, self.population)
-        for mutant in self.mutations:
-            self.mutate_individual(mutant, scale)
+        """Mutate each individual in the population.
+
+        The radius, color, and center of every circle are all perturbed so that we explore more of
+        the fitness landscape.
+        """
+        # Draw the noise for every field of every circle at once.
+        noise = self.rng.standard_normal((4, self.pop_size, self.ind_size), dtype="float32")
+        noise *= scale
+        noise += 1
+        np.maximum(self.radii * noise[0], 1, out=self.m_radii)
+        np.clip(self.colors * noise[1], -255, 255, out=self.m_colors)
+        np.clip(self.centers_x * noise[2], 0, self.width, out=self.m_centers_x)
+        np.clip(self.centers_y * noise[3], 0, self.height, out=self.m_centers_y)
 
-    def reproduce(self):
-        """Reproduce the individuals in the population."""
-        # TODO: Should the population be sorted by fitness?
-        # TODO: Should the best be intentionally reproduced with the worst?
-        raise NotImplementedError
+    @staticmethod
+    def _take(general, mutants, indices):
+        """Take the given rows of the general population and mutations, as if they were joined.
+
+        This avoids building the joint array only to throw half of it away.
+        """
+        pop_size = len(general)
+        from_general = indices < pop_size
+        taken = np.empty((len(indices),) + general.shape[1:], dtype=general.dtype)
+        taken[from_general] = general[indices[from_general]]
+        taken[~from_general] = mutants[indices[~from_general] - pop_size]
+        return taken
 
     def select(self):
         """Select the top 50% of the population based on fitness."""
-        joint = np.concatenate((self.population, self.mutations))
         fit = np.concatenate((self.fitnesses, self.mutation_fitnesses))
+        # The population doesn't need to be sorted, so only partition out the best half.
+        indices = np.argpartition(fit, self.pop_size)[: self.pop_size]
 
-        indices = np.argsort(fit)
-        joint = joint[indices]
-        fit = fit[indices]
-
-        self.population = joint[: self.pop_size]
-        self.fitnesses = fit[: self.pop_size]
+        # Every field of the population is permuted by the same indices.
+        self.centers_x, self.centers_y, self.radii, self.colors = (
+            self._take(individuals, mutants, indices)
+            for individuals, mutants in zip(self.population, self.mutations)
+        )
+        self.fitnesses = fit[indices]
 
     # TODO: Display the current best individual as the EA progresses.
     def run(self, generations, verbose=False):
@@ -189,17 +149,14 @@ class EvolutionaryAlgorithm:
         :rtype: An array of EvolutionaryAlgorithm.HistoryDtype objects.
         """
         self.init_pop()
-        self.evaluate(population="general")
+        self.evaluate()
 
         fitnesses = np.zeros(generations)
         individuals = np.zeros((generations, self.ind_size), dtype=CircleDtype)
         for gen in range(generations):
-            # self.reproduce()
             self.mutate(scale=1.0)
-            # TODO: This is 95+% of the runtime of the run() function call.
-            # And compute_image is 95+% of this call.
-            self.evaluate(population="general")
-            self.evaluate(population="mutations")
+            # The general population's fitnesses carry over from the previous generation.
+            self.evaluate_mutations()
 
             self.select()
 
@@ -210,6 +167,9 @@ class EvolutionaryAlgorithm:
                     end="",
                 )
             fitnesses[gen] = self.fitnesses[best]
-            individuals[gen] = self.population[best]
+            individuals[gen]["center"]["x"] = self.centers_x[best]
+            individuals[gen]["center"]["y"] = self.centers_y[best]
+            individuals[gen]["radius"] = self.radii[best]
+            individuals[gen]["color"] = self.colors[best]
 
         return fitnesses, individuals
@@ -1,4 +1,6 @@
+import functools
 import itertools
+import math
 
 import numpy as np
 
@@ -17,6 +19,40 @@ def fitness(image1, image2):
     return np.sum(np.abs(image1 - image2)) / (height * width)
 
 
+@functools.lru_cache(maxsize=1024)
+def half_spans(r2):
+    """Get the half widths of each row of the disk x^2 + y^2 <= r2.
+
+    Every pixel offset is a whole number, so the disk for a real radius r only depends on the whole
+    part of r^2. The spans are cached because the radii are mutated in small steps and keep landing
+    on the same disks.
+
+    :param r2: The whole part of the squared radius.
+    :returns: An array dx where the row y of the disk spans -dx[y + r] <= x <= dx[y + r].
+    """
+    r = math.isqrt(r2)
+    y = np.arange(-r, r + 1)
+    spans = np.floor(np.sqrt(r2 - y * y)).astype(int)
+    # The cached spans are shared, so make sure they can't be modified.
+    spans.flags.writeable = False
+    return spans
+
+
+def disk(cx, cy, r, height, width):
+    """Find the pixels of a (height, width) image covered by the given circle.
+
+    :returns: The slices of the circle's bounding box clipped to the image, and the mask of the
+        covered pixels within that box.
+    """
+    cx, cy, r2 = int(cx), int(cy), int(r * r)
+    ri = math.isqrt(r2)
+    y0, y1 = max(0, cy - ri), min(height, cy + ri + 1)
+    x0, x1 = max(0, cx - ri), min(width, cx + ri + 1)
+    spans = half_spans(r2)[y0 - cy + ri : y1 - cy + ri, np.newaxis]
+    mask = np.abs(np.arange(x0 - cx, x1 - cx)) <= spans
+    return (slice(y0, y1), slice(x0, x1)), mask
+
+
 def pairwise(iterable):
     """Iterate over the given iterable in pairs."""
     a, b = itertools.tee(iterable)
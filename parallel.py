@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import argparse
 import itertools
+import os
 from multiprocessing import Pool
 
 import imageio
@@ -9,12 +10,22 @@ import numpy as np
 
 from evolve import BootstrapAlgorithm
 
+# The target image, set once per worker process by init_worker().
+_target = None
+
+
+def init_worker(target):
+    """Give the worker process its copy of the target image."""
+    global _target
+    _target = target
+
 
 def worker(args):
     """Find an approximation in a separate process."""
-    seed, (target, circles, pop_size, generations) = args
-    ba = BootstrapAlgorithm(target, circles, pop_size, generations, seed)
-    return ba.run()
+    seed, (circles, pop_size, generations) = args
+    ba = BootstrapAlgorithm(_target, circles, pop_size, generations, seed)
+    _, image = ba.run()
+    return image
 
 
 def average(filename, circles, layers, pop_size, generations):
@@ -31,17 +42,18 @@ def average(filename, circles, layers, pop_size, generations):
 
     # Use a different seed for each process to avoid results exactly the same as each other.
     seeds = np.random.randint(low=np.iinfo(np.uint32).max, size=layers)
-    with Pool() as pool:
-        results = pool.map(
+    # The target is handed to each worker once, so each task is just a seed and the parameters.
+    with Pool(initializer=init_worker, initargs=(target,)) as pool:
+        results = pool.imap(
             worker,
-            zip(seeds, itertools.repeat((target, circles, pop_size, generations), times=layers)),
+            zip(seeds, itertools.repeat((circles, pop_size, generations), times=layers)),
+            chunksize=max(1, layers // os.cpu_count()),
         )
-
-    for _, image in results:
-        approximate = approximate + image
+        for image in results:
+            approximate = approximate + image
 
     # Need to normalize because we're summing all of the images together.
-    approximate = approximate / len(results)
+    approximate = approximate / layers
 
     _, axes = plt.subplots(1, 3)
     axes[0].set_title("Best Approximation")
@@ -23,6 +23,12 @@ def parse_args():
     parser.add_argument(
         "--generations", "-g", type=int, default=100, help="The number of generations."
     )
+    parser.add_argument(
+        "--cuda",
+        action="store_true",
+        default=False,
+        help="Evaluate the EA population on the GPU. Requires --ea.",
+    )
     parser.add_argument("image", help="The image to approximate.")
     parser.add_argument("output", nargs="?", default="", help="The filename to save the output to.")
 
@@ -43,7 +49,11 @@ def parse_args():
         "--combined", action="store_true", default=False, help="A combined approach."
     )
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    if args.cuda and not args.ea:
+        parser.error("--cuda requires --ea")
+
+    return args
 
 
 def main(args):
@@ -51,7 +61,9 @@ def main(args):
     approximation = np.zeros_like(target, dtype="float32")
 
     if args.ea:
-        ea = EvolutionaryAlgorithm(target, pop_size=args.population, ind_size=args.circles)
+        ea = EvolutionaryAlgorithm(
+            target, pop_size=args.population, ind_size=args.circles, use_cuda=args.cuda
+        )
         fitnesses, individuals = ea.run(generations=args.generations, verbose=not args.quiet)
         solution = individuals[np.argmin(fitnesses)]
         print("best solution:", solution)